@@ -17,6 +17,25 @@ from aws_cdk import (
 # ------------------------------------------------------------------------------
 # https://docs.aws.amazon.com/cdk/api/latest/python/index.html
 
+# API Gateway HTTP API access log format
+# https://docs.aws.amazon.com/apigateway/latest/developerguide/http-api-logging-variables.html
+ACCESS_LOG_FORMAT = (
+    "requestId:$context.requestId,"
+    "ip:$context.identity.sourceIp,"
+    "requestTime:$context.requestTime,"
+    "httpMethod:$context.httpMethod,"
+    "routeKey:$context.routeKey,"
+    "status:$context.status,"
+    "protocol:$context.protocol,"
+    "responseLength:$context.responseLength,"
+    "integrationRequestId:$context.integration.requestId,"
+    "integrationStatus:$context.integration.integrationStatus,"
+    "integrationLatency:$context.integrationLatency,"
+    "integrationErrorMessage:$context.integrationErrorMessage,"
+    "errorMessageString:$context.error.message,"
+    "authorizerError:$context.authorizer.error"
+)
+
 
 class ShortenerStack(core.Stack):
 
@@ -54,18 +73,44 @@ class ShortenerStack(core.Stack):
             removal_policy=core.RemovalPolicy.DESTROY
         )
 
+        # orjson is not part of the Lambda runtime, so it is built into its own layer at synth time
+        # https://docs.aws.amazon.com/cdk/api/latest/python/aws_cdk.aws_lambda/LayerVersion.html
+        orjson_layer = lambda_.LayerVersion(
+            self, "orjsonLambdaLayer",
+            code=lambda_.Code.from_asset(
+                "./src/layers/orjson",
+                bundling=core.BundlingOptions(
+                    image=lambda_.Runtime.PYTHON_3_9.bundling_image,
+                    # Wheels are pulled for Graviton so the layer matches the function architecture
+                    command=[
+                        "bash", "-c",
+                        "pip install -r requirements.txt -t /asset-output/python "
+                        "--platform manylinux2014_aarch64 --implementation cp "
+                        "--python-version 3.9 --only-binary=:all:"
+                    ]
+                )
+            ),
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_9],
+            compatible_architectures=[lambda_.Architecture.ARM_64]
+        )
+
         Fn = lambda_.Function(
             self, "shortenerLambda",
             handler="lambda_function.lambda_handler",
             code=lambda_.Code.asset("./src/shortener"),
             timeout=core.Duration.seconds(900),
             runtime=lambda_.Runtime.PYTHON_3_9,
+            # Graviton2 gives better price/performance for this workload
+            # https://docs.aws.amazon.com/lambda/latest/dg/foundation-arch.html
+            architecture=lambda_.Architecture.ARM_64,
             tracing=lambda_.Tracing.ACTIVE,
             layers=[
+                # https://docs.powertools.aws.dev/lambda/python/2.15.0/#lambda-layer
                 lambda_.LayerVersion.from_layer_version_arn(
                     self, "awsPowerToolsLambdaLayer",
-                    f"arn:aws:lambda:{region}:017000801446:layer:AWSLambdaPowertoolsPython:3"
-                )
+                    f"arn:aws:lambda:{region}:017000801446:layer:AWSLambdaPowertoolsPythonV2-Arm64:32"
+                ),
+                orjson_layer
             ]
         )
 
@@ -74,6 +119,7 @@ class ShortenerStack(core.Stack):
         Fn.add_environment("POWERTOOLS_METRICS_NAMESPACE", "Shortener")
         Fn.add_environment("POWERTOOLS_SERVICE_NAME", "event-service")
         Fn.add_environment("EVENTBRIDGE_BUS_NAME", bridge.event_bus_name)
+        Fn.add_environment("URL_EXP_TIME", "3600")
 
         bucket.grant_read_write(Fn)
 
@@ -110,22 +156,19 @@ class ShortenerStack(core.Stack):
 
         log_settings = apigw.CfnStage.AccessLogSettingsProperty(
             destination_arn=httpLogGroup.log_group_arn,
-            format="requestId:$context.requestId,ip:$context.identity.sourceIp,requestTime:$context.requestTime,httpMethod:$context.httpMethod,routeKey:$context.routeKey,status:$context.status,protocol:$context.protocol,responseLength:$context.responseLength,integrationRequestId:$context.integration.requestId,integrationStatus:$context.integration.integrationStatus,integrationLatency:$context.integrationLatency,integrationErrorMessage:$context.integrationErrorMessage,errorMessageString:$context.error.message,authorizerError:$context.authorizer.error"
+            format=ACCESS_LOG_FORMAT
         )
 
-        apigw.CfnStageProps(
-            api_id=http_api.http_api_id,
-            auto_deploy=True,
-            stage_name=http_api.default_stage,
-            access_log_settings=(log_settings)
-        )
+        # HttpStage does not expose access logs yet, so they are set on the underlying CfnStage
+        http_api.default_stage.node.default_child.access_log_settings = log_settings
 
         if self.add_stage_name_to_endpoint and self.stage_name is not None:
-            http_api.add_stage(
+            named_stage = http_api.add_stage(
                 "addStage",
                 auto_deploy=True,
                 stage_name=self.stage_name
             )
+            named_stage.node.default_child.access_log_settings = log_settings
 
         apigw.HttpRoute(
             self, "httpRoute",
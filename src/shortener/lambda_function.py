@@ -1,18 +1,51 @@
 import os
+import re
 import json
 import datetime
+import functools
 import uuid
-import boto3
-from botocore.exceptions import ClientError
+from urllib.parse import quote
+import orjson
 from aws_lambda_powertools import Tracer, Logger, Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 
+
+def get_environment_variable(name: str) -> str:
+    """Get a required environment variable, failing at cold start when it is missing
+
+    Args:
+        name (str): Name of the environment variable
+
+    Returns:
+        value (str): Value of the environment variable
+    """
+    value = os.environ.get(name)
+    if not value:
+        raise RuntimeError(f"Missing required environment variable: {name}")
+    return value
+
+
 # Grabbing Environmental Variables on the Lambda Function
 # https://docs.aws.amazon.com/lambda/latest/dg/configuration-envvars.html#configuration-envvars-retrieve
-REGION = os.environ['AWS_REGION']
-ENVIRONMENT = os.environ['ENVIRONMENT']
-BUCKET_NAME = os.environ['SHORTENER_BUCKET_NAME']
-BUS_NAME = os.environ['EVENTBRIDGE_BUS_NAME']
+REGION = get_environment_variable('AWS_REGION')
+ENVIRONMENT = get_environment_variable('ENVIRONMENT')
+BUCKET_NAME = get_environment_variable('SHORTENER_BUCKET_NAME')
+BUS_NAME = get_environment_variable('EVENTBRIDGE_BUS_NAME')
+# Default lifetime in seconds of the presigned URL when the request does not set one
+URL_EXP_TIME = int(os.environ.get('URL_EXP_TIME', '3600'))
+
+# orjson only parses integers from -2**63 to 2**64 - 1 and turns wider ones into floats. Every positive
+# 19 digit integer fits, so only bodies with a run of 20 or more digits, or a negative run of 19 or more,
+# are checked with the stdlib parser
+OVERFLOW_DIGIT_RUN = re.compile(r"-\d{19,}|\d{20,}")
+MIN_JSON_INTEGER = -2 ** 63
+MAX_JSON_INTEGER = 2 ** 64 - 1
+
+# Responses are mostly static, so they are serialized once and only the varying fields are filled in
+INVALID_BODY_RESPONSE = orjson.dumps(
+    {"statusCode": 400, "message": "Invalid JSON in body"}).decode("utf-8")
+EVENT_RESPONSE_HEADER = b'{"statusCode":200,"headers":{"Content-Type":"application/json"},"event":'
+EVENT_RESPONSE_FOOTER = b'}'
 
 # ------------------------------------------------------------------------------
 #                     Documentation for the Lambda Function
@@ -44,18 +77,81 @@ logger = Logger()
 metrics = Metrics()
 
 
+# boto3 is only needed when an event is truncated, so it is imported on first use instead of at cold start.
+# The session and clients are then reused across warm invocations
+# https://docs.aws.amazon.com/lambda/latest/dg/best-practices.html#function-code
+@functools.lru_cache(maxsize=None)
+def get_boto3_session():
+    import boto3
+
+    return boto3.Session(region_name=REGION)
+
+
+@functools.lru_cache(maxsize=None)
+def get_boto3_client(service_name: str):
+    return get_boto3_session().client(service_name)
+
+
+def parse_json_integer(value: str) -> int:
+    """parse_int hook for json.loads rejecting integers that orjson can not represent
+
+    Args:
+        value (str): Integer literal from the JSON document
+
+    Returns:
+        number (int): Parsed integer
+    """
+    number = int(value)
+    if not MIN_JSON_INTEGER <= number <= MAX_JSON_INTEGER:
+        raise ValueError(f"Integer outside of the 64-bit range: {value}")
+    return number
+
+
 @tracer.capture_method(capture_response=False)
 def extract_data(event: dict):
     # Extract the body from event
     if 'body' in event:
         data = event['body']
         try:
-            data = json.loads(data)
-            return data
+            body = orjson.loads(data)
+            # Bodies with integers wider than 64 bits are rejected rather than silently altered,
+            # they could not be serialized again by orjson either
+            if OVERFLOW_DIGIT_RUN.search(data):
+                json.loads(data, parse_int=parse_json_integer)
+            return body
         except ValueError as e:
             return False
 
 
+def get_utf8_size(value: str) -> int:
+    """Calculating the size of a string in bytes when encoded as UTF-8, only encoding
+    strings that are not pure ASCII where the character count is already the byte count
+
+    Args:
+        value (str): String to calculate the size of
+
+    Returns:
+        size (int): Size of the string in bytes
+    """
+    if value.isascii():
+        return len(value)
+    return len(value.encode("utf-8"))
+
+
+@functools.lru_cache(maxsize=256)
+def get_cached_utf8_size(value: str) -> int:
+    """Cached get_utf8_size for low cardinality fields such as source and detail-type,
+    which repeat across warm invocations. Resources are left uncached so they do not evict them
+
+    Args:
+        value (str): String to calculate the size of
+
+    Returns:
+        size (int): Size of the string in bytes
+    """
+    return get_utf8_size(value)
+
+
 @tracer.capture_method(capture_response=False)
 def get_eventbridge_put_event_size(eventbridge_event: dict) -> int:
     """Calculating the size of the event in bytes
@@ -67,21 +163,59 @@ def get_eventbridge_put_event_size(eventbridge_event: dict) -> int:
     Returns:
         size (int): Size of the event in bytes
     """
+    # Missing or null source and detail-type count as empty rather than failing on None
+    source = eventbridge_event.get("source") or ""
+    detail_type = eventbridge_event.get("detail-type") or ""
+    detail = eventbridge_event.get("detail")
+    resources = eventbridge_event.get("resources") or ()
+
     size = 0
     if eventbridge_event.get("time") is not None:
         size += 14
-    size += len(eventbridge_event.get("source").encode("utf-8"))
-    size += len(eventbridge_event.get("detail-type").encode("utf-8"))
-    size += len(json.dumps(eventbridge_event.get("detail")).encode("utf-8"))
-    for resource in eventbridge_event.get("resources", []):
-        if resource:
-            size += len(resource.encode("utf-8"))
+    size += get_cached_utf8_size(source)
+    size += get_cached_utf8_size(detail_type)
+    # orjson serializes compactly straight to utf-8 bytes, so no separate encode is needed
+    size += len(orjson.dumps(detail))
+    size += sum(get_utf8_size(resource) for resource in resources if resource)
 
-    tracer.put_annotation(key="EventSize", value=size)
+    return size
+
+
+def get_json_member_size(key: str, value, has_siblings: bool) -> int:
+    """Calculating the size in bytes that a single key/value pair adds to a compact JSON object,
+    used to update a known event size without serializing the whole detail again
+
+    Args:
+        key (str): Key of the member
+        value: Value of the member
+        has_siblings (bool): True if the object has other members, accounting for the separating comma
+
+    Returns:
+        size (int): Size of the member in bytes
+    """
+    # Dropping the two enclosing braces of the single member object
+    size = len(orjson.dumps({key: value})) - 2
+    if has_siblings:
+        size += 1
 
     return size
 
 
+def get_event_trucation_size(metadata: dict) -> int:
+    """Calculating the size in bytes of the event_trucation member of the event metadata
+
+    Args:
+        metadata (dict): Metadata of the event detail
+
+    Returns:
+        size (int): Size of the member in bytes, 0 when the metadata does not have one
+    """
+    if "event_trucation" not in metadata:
+        return 0
+
+    return get_json_member_size("event_trucation", metadata["event_trucation"], has_siblings=len(metadata) > 1)
+
+
 @tracer.capture_method(capture_response=False)
 def put_event_size_metrics(event_size: int, event_type: str, put_event_id: str) -> None:
     """CloudWatch embedded metric format enables you to ingest complex high-cardinality application
@@ -96,9 +230,12 @@ def put_event_size_metrics(event_size: int, event_type: str, put_event_id: str)
     Returns:
         None
     """
+    tracer.put_annotation(key="EventSize", value=event_size)
+
+    # The event count is the SampleCount of Size, and the event type is kept as metadata
+    # rather than a dimension so every type does not become its own billed metric
     metrics.add_metric(name="Size", unit=MetricUnit.Bytes, value=event_size)
-    metrics.add_metric(name="Count", unit=MetricUnit.Count, value=1)
-    metrics.add_dimension(name="EventType", value=event_type)
+    metrics.add_metadata(key="EventType", value=event_type)
     metrics.add_metadata(key="PutEventId", value=put_event_id)
     return None
 
@@ -153,41 +290,71 @@ def add_event_metadata(event: dict, trucated_event: bool, presigned_url: str = N
     return event
 
 
+def sign_presigned_url(bucket_name: str, object_path: str, expiration: int) -> str:
+    """Sign a presigned GET URL for an S3 object directly with the SigV4 query signer,
+    skipping the event hooks and endpoint resolution generate_presigned_url runs through
+
+    Args:
+        bucket_name (str): Name of the bucket
+        object_path (str): Path to the file
+        expiration (int): Time in seconds for the presigned URL to remain valid
+
+    Returns:
+        Presigned URL as string
+    """
+    from botocore.auth import S3SigV4QueryAuth
+    from botocore.awsrequest import AWSRequest
+
+    # The botocore session caches the credentials it resolves
+    # https://botocore.amazonaws.com/v1/documentation/api/latest/reference/credentials.html
+    credentials = get_boto3_session().get_credentials()
+
+    request = AWSRequest(
+        method="GET",
+        url=f"https://{bucket_name}.s3.{REGION}.amazonaws.com/{quote(object_path)}"
+    )
+    S3SigV4QueryAuth(credentials, "s3", REGION, expires=expiration).add_auth(request)
+
+    return request.url
+
+
 @tracer.capture_method(capture_response=False)
-def create_presigned_url(bucket_name: str, file_name: str, object_path: str, file_content: str, expiration: int) -> str:
+def create_presigned_url(bucket_name: str, object_path: str, file_content: bytes, expiration: int) -> str:
     """Generate a presigned URL to share an S3 object
     https://boto3.amazonaws.com/v1/documentation/api/latest/guide/s3-presigned-urls.html
 
     Args:
         bucket_name (str): Name of the bucket
         object_path (str): Path to the file
-        file_content (str): Content of the file
+        file_content (bytes): Content of the file
         expiration (str): (Optional) Time in seconds for the presigned URL to remain valid
 
     Returns:
         Presigned URL as string. If error, returns None.
     """
+    from botocore.exceptions import BotoCoreError, ClientError
 
-    s3 = boto3.client('s3')
+    s3_client = get_boto3_client('s3')
 
     try:
-        file_path = "/tmp/" + file_name
-        with open(file_path, 'w') as f:
-            f.write(file_content)
-
-        s3.upload_file(
-            file_path,
-            bucket_name,
-            object_path,
-            ExtraArgs={'ContentType': 'text/csv'}
+        # The content is always under the EventBridge limit, so a single put is enough
+        s3_client.put_object(
+            Bucket=bucket_name,
+            Key=object_path,
+            Body=file_content,
+            ContentType='application/json'
         )
 
-        response = s3.generate_presigned_url(
-            ClientMethod="get_object",
-            ExpiresIn=expiration,
-            HttpMethod="GET",
-            Params={"Bucket": bucket_name, "Key": object_path}
-        )
+        try:
+            response = sign_presigned_url(bucket_name, object_path, expiration)
+        except BotoCoreError as e:
+            logger.warning(e)
+            response = s3_client.generate_presigned_url(
+                ClientMethod="get_object",
+                ExpiresIn=expiration,
+                HttpMethod="GET",
+                Params={"Bucket": bucket_name, "Key": object_path}
+            )
 
         logger.info("Presigned URL: " + response)
 
@@ -211,15 +378,13 @@ def send_event_to_eventbridge(event: dict) -> None:
     Returns:
         None
     """
-    eventbridge = boto3.client('events')
-
     logger.info("Sending event to EventBridge")
 
     # Add Eventbridge Bus Name to the event
     add_bus_name = event["detail"]["EventBusName"] = BUS_NAME
     event["detail"]["metadata"].update(add_bus_name)
 
-    eventbridge.put_events(Entries=[event])
+    get_boto3_client('events').put_events(Entries=[event])
     return None
 
 
@@ -231,47 +396,54 @@ def lambda_handler(event, context):
     # Extract the body from event
     event_data = extract_data(event)
     if event_data is False:
-        response = {"statusCode": 400, "message": "Invalid JSON in body"}
-        return json.dumps(response)
+        return INVALID_BODY_RESPONSE
 
-    if event['queryStringParameters']['presigned_url_expiration']:
+    # HTTP APIs omit queryStringParameters entirely when the request has none
+    query_string_parameters = event.get('queryStringParameters') or {}
+    if query_string_parameters.get('presigned_url_expiration'):
         url_expiration = int(
-            event['queryStringParameters']['presigned_url_expiration'])
+            query_string_parameters['presigned_url_expiration'])
         logger.info(
             "Presigned URL expiration set to: {}".format(url_expiration))
     else:
-        url_expiration = 3600
+        url_expiration = URL_EXP_TIME
         logger.info(
             "Presigned URL expiration set to: {}".format(url_expiration))
 
     # Getting size of the event in bytes and check if it is over the limit
-    # initial_event_size = get_eventbridge_put_event_size(event_data)
+    initial_event_size = get_eventbridge_put_event_size(event_data)
     # 256000 - 50 for minimum metadata size (technically 47 but rounding up for safety)
-    if get_eventbridge_put_event_size(event_data) > 255950:
+    if initial_event_size > 255950:
         print("Event Size Larger than EventBrige Event Payload Limit")
 
-        # Calculating the size of the event in bytes for the data field that will be truncated
+        # Serializing the data field that will be truncated once, the bytes are both the uploaded
+        # file content and the size that is removed from the event
         truncated_event_data = event_data["detail"].get("data")
-        truncated_data_size = len(json.dumps(event_data).encode("utf-8"))
+        truncated_event_bytes = orjson.dumps(truncated_event_data)
+        truncated_data_size = len(truncated_event_bytes)
+
+        # The detail always keeps its metadata member, so removing data also drops a separating comma
+        removed_data_size = 0
+        if "data" in event_data["detail"]:
+            removed_data_size = len('"data":') + truncated_data_size + 1
 
-        # Create File Name using Context Request ID
-        generate_uuid_filename = str(uuid.uuid4())
-        generate_file_name = f"{generate_uuid_filename}.json"
-        current_date = datetime.datetime.today()
-        file_object_path = f"{str(current_date.year)}/{str(current_date.month)}/{str(current_date.day)}/{generate_file_name}"
+        # An event_trucation sent by the client is replaced, so its size is removed as well
+        replaced_trucation_size = get_event_trucation_size(event_data["detail"]["metadata"])
+
+        # Create the Object Path using the current date and a UUID as the File Name
+        file_object_path = f"{datetime.datetime.utcnow():%Y/%m/%d}/{uuid.uuid4().hex}.json"
 
         # Generating a presigned URL for the file that will contained the truncated event data
-        presigned_url = create_presigned_url(bucket_name=BUCKET_NAME, file_name=generate_file_name,
-                                             object_path=file_object_path, file_content=str(
-                                                 truncated_event_data),
-                                             expiration=url_expiration)
+        presigned_url = create_presigned_url(bucket_name=BUCKET_NAME, object_path=file_object_path,
+                                             file_content=truncated_event_bytes, expiration=url_expiration)
 
         # Add truncated metadata to the event and remove the data field
         event_with_metadata = add_event_metadata(event_data, trucated_event=True, presigned_url=presigned_url,
                                                  event_data_size=truncated_data_size, bucket_name=BUCKET_NAME, object_path=file_object_path)
 
-        # Calculating the size of the event after adding metadata
-        final_event_size = get_eventbridge_put_event_size(event_with_metadata)
+        # Calculating the size of the event after removing the data field and adding metadata
+        final_event_size = (initial_event_size - removed_data_size - replaced_trucation_size
+                            + get_event_trucation_size(event_with_metadata["detail"]["metadata"]))
 
         # Send the event to EventBridge
         send_event_to_eventbridge(event=event_with_metadata)
@@ -279,32 +451,30 @@ def lambda_handler(event, context):
         put_event_size_metrics(event_size=final_event_size, event_type=event_data.get(
             "detail-type"), put_event_id=context.aws_request_id)
 
-        response = {"statusCode": 200,
-                    "headers": {"Content-Type": "application/json"},
-                    "event": {
-                        "event_trucated": True,
-                        "presigned_url": presigned_url,
-                        "event_size": final_event_size
-                    }
-                    }
-        return json.dumps(response)
+        response_event = orjson.dumps({
+            "event_trucated": True,
+            "presigned_url": presigned_url,
+            "event_size": final_event_size
+        })
+        return (EVENT_RESPONSE_HEADER + response_event + EVENT_RESPONSE_FOOTER).decode("utf-8")
     else:
+        # An event_trucation sent by the client is replaced, so its size is removed as well
+        replaced_trucation_size = get_event_trucation_size(event_data["detail"]["metadata"])
+
         # Add truncated metadata to the event
         event_with_metadata = add_event_metadata(
             event_data, trucated_event=False)
 
-        # Calculating the size of the event after adding metadata
-        final_event_size = get_eventbridge_put_event_size(event_with_metadata)
+        # Calculating the size of the event after adding metadata, only the added member needs measuring
+        final_event_size = (initial_event_size - replaced_trucation_size
+                            + get_event_trucation_size(event_with_metadata["detail"]["metadata"]))
 
         # Put Cloudwatch Logs Metrics
         put_event_size_metrics(event_size=final_event_size, event_type=event_data.get(
             "detail-type"), put_event_id=context.aws_request_id)
 
-        response = {"statusCode": 200,
-                    "headers": {"Content-Type": "application/json"},
-                    "event": {
-                        "event_trucated": False,
-                        "event_size": final_event_size
-                    }
-                    }
-        return json.dumps(response)
+        response_event = orjson.dumps({
+            "event_trucated": False,
+            "event_size": final_event_size
+        })
+        return (EVENT_RESPONSE_HEADER + response_event + EVENT_RESPONSE_FOOTER).decode("utf-8")
@@ -2,24 +2,57 @@ import json
 import pytest
 
 from aws_cdk import core
-from eventbridge_shortener.eventbridge_shortener_stack import EventbridgeShortenerStack
+from eventbridge_shortener.eventbridge_shortener_stack import ShortenerStack, ACCESS_LOG_FORMAT
 
 
-def get_template():
-    app = core.App()
-    EventbridgeShortenerStack(app, "eventbridge-shortener")
+def synth_template(**kwargs):
+    # Skipping Docker asset bundling, the layer contents are not under test
+    app = core.App(context={"aws:cdk:bundling-stacks": []})
+    ShortenerStack(
+        app, "eventbridge-shortener", "shortener", "test", ["DoStuff"], "https://example.com/",
+        http_default_stage=True, domainName="api.example.com", **kwargs
+    )
     return json.dumps(app.synth().get_stack("eventbridge-shortener").template)
 
 
-def test_eventbridge_bus_created():
-    assert("AWS::Events::EventBus" in get_template())
+@pytest.fixture(scope="session")
+def template():
+    # Synthesizing once for the whole session
+    return synth_template()
 
-def test_s3_bucket_created():
-    assert("AWS::S3::Bucket" in get_template())
 
-def test_lambda_function_created():
-    assert("AWS::Lambda::Function" in get_template())
+def get_resources(template, resource_type):
+    return {
+        logical_id: resource for logical_id, resource in json.loads(template)["Resources"].items()
+        if resource["Type"] == resource_type
+    }
 
-def test_http_api_created():
-    assert("AWS::ApiGatewayV2::Api" in get_template())
 
+def assert_access_logs_configured(template, stage_names):
+    [log_group_id] = get_resources(template, "AWS::Logs::LogGroup")
+    stages = get_resources(template, "AWS::ApiGatewayV2::Stage").values()
+    assert(sorted(stage["Properties"]["StageName"] for stage in stages) == sorted(stage_names))
+    for stage in stages:
+        access_log_settings = stage["Properties"]["AccessLogSettings"]
+        assert(access_log_settings["DestinationArn"] == {"Fn::GetAtt": [log_group_id, "Arn"]})
+        assert(access_log_settings["Format"] == ACCESS_LOG_FORMAT)
+
+
+def test_eventbridge_bus_created(template):
+    assert("AWS::Events::EventBus" in template)
+
+def test_s3_bucket_created(template):
+    assert("AWS::S3::Bucket" in template)
+
+def test_lambda_function_created(template):
+    assert("AWS::Lambda::Function" in template)
+
+def test_http_api_created(template):
+    assert("AWS::ApiGatewayV2::Api" in template)
+
+def test_http_api_access_logs_configured(template):
+    assert_access_logs_configured(template, ["$default"])
+
+def test_http_api_named_stage_access_logs_configured():
+    template = synth_template(add_stage_name_to_endpoint=True, stage_name="v1")
+    assert_access_logs_configured(template, ["$default", "v1"])
@@ -0,0 +1,181 @@
+import os
+import sys
+
+import orjson
+import pytest
+
+# The handler reads its configuration at import time
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("ENVIRONMENT", "test")
+os.environ.setdefault("SHORTENER_BUCKET_NAME", "shortener-test-bucket")
+os.environ.setdefault("EVENTBRIDGE_BUS_NAME", "shortener-test-event-bus")
+os.environ.setdefault("POWERTOOLS_TRACE_DISABLED", "true")
+os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "Shortener")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src", "shortener"))
+
+import lambda_function  # noqa: E402
+
+
+def test_extract_data_parses_body():
+    assert(lambda_function.extract_data({"body": '{"a":1}'}) == {"a": 1})
+
+def test_extract_data_rejects_invalid_json():
+    assert(lambda_function.extract_data({"body": "{"}) is False)
+
+def test_extract_data_keeps_64_bit_integers():
+    body = '{"a":18446744073709551615,"b":-9223372036854775808}'
+    assert(lambda_function.extract_data({"body": body}) == {"a": 2 ** 64 - 1, "b": -2 ** 63})
+
+@pytest.mark.parametrize("number", ["18446744073709551616", "-9223372036854775809"])
+def test_extract_data_rejects_integers_wider_than_64_bits(number):
+    assert(lambda_function.extract_data({"body": '{"a":%s}' % number}) is False)
+
+def test_extract_data_allows_long_digit_strings():
+    body = '{"a":"123456789012345678901234567890"}'
+    assert(lambda_function.extract_data({"body": body}) == {"a": "123456789012345678901234567890"})
+
+@pytest.mark.parametrize("body, expected", [
+    ('{"a":1791951709261923408}', {"a": 1791951709261923408}),
+    ('{"a":9999999999999999999}', {"a": 9999999999999999999}),
+    ('{"a":0.0012345678901234567}', {"a": 0.0012345678901234567}),
+    ('{"a":"1791951709261923408"}', {"a": "1791951709261923408"}),
+])
+def test_extract_data_skips_stdlib_parser_for_in_range_values(monkeypatch, body, expected):
+    class StdlibJson:
+        @staticmethod
+        def loads(*args, **kwargs):
+            raise AssertionError("stdlib json parser used")
+
+    monkeypatch.setattr(lambda_function, "json", StdlibJson)
+    assert(lambda_function.extract_data({"body": body}) == expected)
+
+
+@pytest.mark.parametrize("obj, key", [
+    ({"a": 1}, "a"),
+    ({"a": 1, "b": {"c": [1, "é"]}}, "b"),
+    ({"b": {"c": None}, "a": "x"}, "b"),
+])
+def test_get_json_member_size(obj, key):
+    without_member = {k: v for k, v in obj.items() if k != key}
+    size = lambda_function.get_json_member_size(key, obj[key], has_siblings=len(obj) > 1)
+    assert(size == len(orjson.dumps(obj)) - len(orjson.dumps(without_member)))
+
+
+class LambdaContext:
+    function_name = "shortener"
+    memory_limit_in_mb = 128
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:shortener"
+    aws_request_id = "52fdfc07-2182-154f-163f-5f0f9a621d72"
+
+
+METADATA_CASES = {
+    "empty metadata": {},
+    "metadata": {"service": "myAwesomeSerice"},
+    "existing event_trucation": {"service": "myAwesomeSerice", "event_trucation": {"old": 1}},
+    "only event_trucation": {"event_trucation": {"old": 1}},
+}
+
+
+def put_event(monkeypatch, event_data):
+    """Running the handler and returning its reported size with the event it produced"""
+    produced = {}
+    add_event_metadata = lambda_function.add_event_metadata
+
+    def capture_event_metadata(*args, **kwargs):
+        produced["event"] = add_event_metadata(*args, **kwargs)
+        return produced["event"]
+
+    monkeypatch.setattr(lambda_function, "add_event_metadata", capture_event_metadata)
+    monkeypatch.setattr(lambda_function, "create_presigned_url", lambda **kwargs: "https://example.com/object")
+    monkeypatch.setattr(lambda_function, "send_event_to_eventbridge", lambda event: None)
+
+    response = lambda_function.lambda_handler(
+        {"body": orjson.dumps(event_data).decode("utf-8"), "queryStringParameters": None}, LambdaContext())
+    return orjson.loads(response)["event"], produced["event"]
+
+
+@pytest.mark.parametrize("metadata", METADATA_CASES.values(), ids=METADATA_CASES.keys())
+def test_event_size_not_truncated(monkeypatch, metadata):
+    event_data = {"source": "WidgitsService", "detail-type": "NewCustomerOpportunity",
+                  "detail": {"metadata": dict(metadata), "data": {"AccountId": "6417c247"}}}
+    response_event, event = put_event(monkeypatch, event_data)
+    assert(response_event["event_trucated"] is False)
+    assert(response_event["event_size"] == lambda_function.get_eventbridge_put_event_size(event))
+
+
+@pytest.mark.parametrize("metadata", METADATA_CASES.values(), ids=METADATA_CASES.keys())
+@pytest.mark.parametrize("has_data", [True, False], ids=["data", "missing data"])
+def test_event_size_truncated(monkeypatch, metadata, has_data):
+    detail = {"metadata": dict(metadata)}
+    if has_data:
+        detail["data"] = {"dataToLarge": {"data": "x" * 256000}}
+    else:
+        detail["metadata"]["dataToLarge"] = "x" * 256000
+    event_data = {"source": "WidgitsService", "detail-type": "NewCustomerOpportunity",
+                  "resources": ["arn:aws:s3:::bucket"], "detail": detail}
+    response_event, event = put_event(monkeypatch, event_data)
+    assert(response_event["event_trucated"] is True)
+    assert("data" not in event["detail"])
+    assert(response_event["event_size"] == lambda_function.get_eventbridge_put_event_size(event))
+
+
+@pytest.fixture
+def session(monkeypatch):
+    import boto3
+
+    test_session = boto3.Session(
+        aws_access_key_id="AKIDEXAMPLE", aws_secret_access_key="wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+        aws_session_token="session-token", region_name="us-east-1"
+    )
+    monkeypatch.setattr(lambda_function, "get_boto3_session", lambda: test_session)
+    return test_session
+
+
+def test_sign_presigned_url_matches_botocore(monkeypatch, session):
+    import datetime
+    import botocore.auth
+    from botocore.config import Config
+
+    now = datetime.datetime(2021, 8, 1, 12, 30, 0)
+    monkeypatch.setattr(botocore.auth, "get_current_datetime", lambda: now)
+
+    s3_client = session.client(
+        "s3", endpoint_url="https://s3.us-east-1.amazonaws.com",
+        config=Config(signature_version="s3v4", s3={"addressing_style": "virtual"})
+    )
+    expected = s3_client.generate_presigned_url(
+        ClientMethod="get_object", ExpiresIn=3600, HttpMethod="GET",
+        Params={"Bucket": "shortener-test-bucket", "Key": "2021/08/01/object.json"}
+    )
+    url = lambda_function.sign_presigned_url("shortener-test-bucket", "2021/08/01/object.json", 3600)
+    assert(url == expected)
+
+
+class S3Client:
+    def __init__(self):
+        self.put_object_calls = []
+
+    def put_object(self, **kwargs):
+        self.put_object_calls.append(kwargs)
+
+    def generate_presigned_url(self, **kwargs):
+        return "https://example.com/fallback"
+
+
+def test_create_presigned_url_falls_back_to_generate_presigned_url(monkeypatch):
+    from botocore.exceptions import NoCredentialsError
+
+    def sign_presigned_url(bucket_name, object_path, expiration):
+        raise NoCredentialsError()
+
+    s3_client = S3Client()
+    monkeypatch.setattr(lambda_function, "sign_presigned_url", sign_presigned_url)
+    monkeypatch.setattr(lambda_function, "get_boto3_client", lambda service_name: s3_client)
+
+    url = lambda_function.create_presigned_url(
+        bucket_name="shortener-test-bucket", object_path="2021/08/01/object.json", file_content=b"{}", expiration=3600)
+    assert(url == "https://example.com/fallback")
+    assert(s3_client.put_object_calls == [{
+        "Bucket": "shortener-test-bucket", "Key": "2021/08/01/object.json",
+        "Body": b"{}", "ContentType": "application/json"
+    }])